@@ -153,7 +153,7 @@ MICROSOFT_TENANT_ID = os.environ.get('MICROSOFT_TENANT_ID', '')
 
 # OPTION 2: Traditional SMTP with App Password (Legacy)
 # Uncomment these lines to use traditional SMTP authentication instead of OAuth2
-# EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# EMAIL_BACKEND = 'website.mail_pool.PooledSMTPBackend'
 # EMAIL_HOST_USER = 'admin@diasporaenterprise.com'
 # EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASSWORD', '')
 
@@ -161,6 +161,9 @@ MICROSOFT_TENANT_ID = os.environ.get('MICROSOFT_TENANT_ID', '')
 EMAIL_HOST = 'smtp.office365.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+# Seconds before a blocking SMTP operation (connect, TLS, send) gives up,
+# so a stalled server cannot hang a worker thread indefinitely
+EMAIL_TIMEOUT = 10
 DEFAULT_FROM_EMAIL = 'admin@diasporaenterprise.com'
 ADMIN_EMAIL = 'admin@diasporaenterprise.com'
 
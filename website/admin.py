@@ -1,6 +1,27 @@
-from django.contrib import admin
-from django.utils.html import format_html
+import logging
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.utils.safestring import mark_safe
 from .models import Contact
+from .tasks import run_in_background, send_acknowledgements
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Status badges are constant markup, so build them once at import time
+_READ_HTML = mark_safe('<span style="color: green; font-weight: bold;">✓ Read</span>')
+_UNREAD_HTML = mark_safe('<span style="color: red; font-weight: bold;">✗ Unread</span>')
+
+
+class ContactChangeList(ChangeList):
+    """
+    Changelist that only fetches the columns shown in the list view.
+    The large message/notes text fields are left out of each page query.
+    """
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).for_list()
 
 
 @admin.register(Contact)
@@ -15,6 +36,10 @@ class ContactAdmin(admin.ModelAdmin):
     list_filter = ['read', 'created_at']
     search_fields = ['name', 'email', 'subject', 'message']
     readonly_fields = ['created_at', 'name', 'email', 'phone', 'subject', 'message']
+    list_select_related = True
+    list_per_page = 50
+    # Skip the extra unfiltered COUNT(*) behind the "N total" link
+    show_full_result_count = False
 
     # Fields to display in the detail view
     fieldsets = (
@@ -35,39 +60,47 @@ class ContactAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
 
     # Actions
-    actions = ['mark_as_read', 'mark_as_unread']
+    actions = ['mark_as_read', 'mark_as_unread', 'send_acknowledgement']
 
+    def get_changelist(self, request, **kwargs):
+        """Use the column-limited changelist for the list view"""
+        return ContactChangeList
+
+    @admin.display(description='Received At', ordering='created_at')
     def created_at_formatted(self, obj):
         """Format the created_at timestamp for display"""
         return obj.created_at.strftime('%Y-%m-%d %H:%M')
-    created_at_formatted.short_description = 'Received At'
-    created_at_formatted.admin_order_field = 'created_at'
 
+    @admin.display(description='Status', ordering='read')
     def read_status(self, obj):
         """Display read status with color coding"""
-        if obj.read:
-            return format_html(
-                '<span style="color: green; font-weight: bold;">✓ Read</span>'
-            )
-        else:
-            return format_html(
-                '<span style="color: red; font-weight: bold;">✗ Unread</span>'
-            )
-    read_status.short_description = 'Status'
-    read_status.admin_order_field = 'read'
+        return _READ_HTML if obj.read else _UNREAD_HTML
 
     @admin.action(description='Mark selected messages as read')
     def mark_as_read(self, request, queryset):
         """Bulk action to mark messages as read"""
-        updated = queryset.update(read=True)
+        updated = queryset.mark_as_read()
         self.message_user(request, f'{updated} message(s) marked as read.')
 
     @admin.action(description='Mark selected messages as unread')
     def mark_as_unread(self, request, queryset):
         """Bulk action to mark messages as unread"""
-        updated = queryset.update(read=False)
+        updated = queryset.mark_as_unread()
         self.message_user(request, f'{updated} message(s) marked as unread.')
 
+    @admin.action(description='Send acknowledgement email to selected senders')
+    def send_acknowledgement(self, request, queryset):
+        """Bulk action to email each sender that their message was received"""
+        contact_ids = list(queryset.values_list('pk', flat=True))
+        try:
+            # Sent on the email worker over one SMTP session
+            run_in_background(send_acknowledgements, contact_ids)
+        except RuntimeError as e:
+            logger.error(f"Failed to queue acknowledgement emails: {str(e)}")
+            self.message_user(request, 'Acknowledgement emails could not be queued.', messages.ERROR)
+            return
+        self.message_user(request, f'Acknowledgement email queued for {len(contact_ids)} message(s).')
+
     def has_add_permission(self, request):
         """Disable manual addition of contact messages through admin"""
         return False
@@ -18,29 +18,74 @@ Security:
 """
 
 import base64
+import functools
 import logging
 import smtplib
 import threading
-from smtplib import SMTPAuthenticationError, SMTPException
+from smtplib import SMTPAuthenticationError, SMTPException, SMTPResponseException
 from typing import Optional
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail.backends.smtp import EmailBackend
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from msal import ConfidentialClientApplication
 
+from .mail_pool import PooledConnectionMixin
+
 logger = logging.getLogger(__name__)
 
+# Stop using a cached token this many seconds before it expires
+TOKEN_EXPIRY_MARGIN = 60
+
+# Token endpoint errors caused by the app registration itself (bad client
+# ID or secret, missing consent); retrying will not fix them
+PERMANENT_TOKEN_ERRORS = frozenset({'invalid_client', 'unauthorized_client'})
+
+
+@functools.lru_cache(maxsize=None)
+def oauth2_credentials() -> tuple:
+    """(client_id, client_secret, tenant_id) read once from settings"""
+    return (
+        getattr(settings, 'MICROSOFT_CLIENT_ID', ''),
+        getattr(settings, 'MICROSOFT_CLIENT_SECRET', ''),
+        getattr(settings, 'MICROSOFT_TENANT_ID', ''),
+    )
+
+
+@receiver(setting_changed)
+def _reset_oauth2_credentials(*, setting, **kwargs):
+    """Pick up override_settings() changes to the OAuth2 credentials"""
+    if setting.startswith('MICROSOFT_'):
+        oauth2_credentials.cache_clear()
 
-class OAuth2EmailBackend(EmailBackend):
+
+@functools.lru_cache(maxsize=4)
+def _oauth2_b64(user: str, access_token: str) -> str:
+    """Base64-encoded XOAUTH2 string, reused until the token rotates"""
+    # Build the SASL payload as bytes directly; SMTP AUTH arguments and
+    # bearer tokens are ASCII
+    auth_bytes = b"".join((
+        b"user=", user.encode('ascii'),
+        b"\x01auth=Bearer ", access_token.encode('ascii'),
+        b"\x01\x01",
+    ))
+    return base64.b64encode(auth_bytes).decode('ascii')
+
+
+class OAuth2EmailBackend(PooledConnectionMixin, EmailBackend):
     """
     Custom email backend that uses OAuth2 for Microsoft 365 authentication.
 
     This backend extends Django's SMTP EmailBackend to support OAuth2
     authentication using the XOAUTH2 SMTP authentication mechanism.
+    Authenticated connections are reused through website.mail_pool.
     """
 
-    # Class-level token cache (thread-safe)
-    _token_cache = {}
+    # Class-level MSAL applications (thread-safe). Each one owns the token
+    # cache for its client.
+    _msal_apps = {}
     _token_lock = threading.Lock()
 
     def __init__(self, host=None, port=None, username=None, password=None,
@@ -70,12 +115,11 @@ class OAuth2EmailBackend(EmailBackend):
         )
 
         # Get OAuth2 credentials from settings
-        self.client_id = getattr(settings, 'MICROSOFT_CLIENT_ID', '')
-        self.client_secret = getattr(settings, 'MICROSOFT_CLIENT_SECRET', '')
-        self.tenant_id = getattr(settings, 'MICROSOFT_TENANT_ID', '')
+        self.client_id, self.client_secret, self.tenant_id = oauth2_credentials()
 
-        # Validate credentials are set
-        if not all([self.client_id, self.client_secret, self.tenant_id]):
+        # Validate credentials are set (settings do not change at runtime)
+        self._credentials_ok = bool(self.client_id and self.client_secret and self.tenant_id)
+        if not self._credentials_ok:
             logger.warning(
                 "OAuth2 credentials not fully configured. "
                 "Set MICROSOFT_CLIENT_ID, MICROSOFT_CLIENT_SECRET, and MICROSOFT_TENANT_ID."
@@ -84,19 +128,43 @@ class OAuth2EmailBackend(EmailBackend):
         # MSAL application instance (lazy initialization)
         self._msal_app: Optional[ConfidentialClientApplication] = None
 
+    @property
+    def auth_user(self) -> str:
+        """
+        Email address to authenticate as.
+        Uses EMAIL_HOST_USER from settings, or falls back to DEFAULT_FROM_EMAIL.
+        """
+        return self.username or settings.DEFAULT_FROM_EMAIL
+
+    def get_pool_key(self):
+        """Pooled connections are authenticated as auth_user"""
+        return (self.host, self.port, self.auth_user)
+
     @property
     def msal_app(self) -> ConfidentialClientApplication:
         """
         Get or create MSAL application instance.
         Lazy initialization to avoid creating app when not needed.
+
+        One application is shared per (client_id, tenant_id) across all
+        backend instances, so its authority metadata, HTTP session and
+        token cache survive between sends.
         """
         if self._msal_app is None:
-            authority = f"https://login.microsoftonline.com/{self.tenant_id}"
-            self._msal_app = ConfidentialClientApplication(
-                client_id=self.client_id,
-                client_credential=self.client_secret,
-                authority=authority
-            )
+            app_key = (self.client_id, self.tenant_id)
+            with self._token_lock:
+                app = self._msal_apps.get(app_key)
+                if app is None:
+                    authority = f"https://login.microsoftonline.com/{self.tenant_id}"
+                    app = ConfidentialClientApplication(
+                        client_id=self.client_id,
+                        client_credential=self.client_secret,
+                        authority=authority,
+                        # Bound the token request the same way as SMTP calls
+                        timeout=self.timeout,
+                    )
+                    self._msal_apps[app_key] = app
+            self._msal_app = app
         return self._msal_app
 
     def get_access_token(self) -> str:
@@ -110,69 +178,92 @@ class OAuth2EmailBackend(EmailBackend):
             str: Access token for authenticating to SMTP server
 
         Raises:
-            SMTPAuthenticationError: If token acquisition fails
+            SMTPAuthenticationError: If the credentials or app registration
+                are rejected
+            SMTPException: If the token endpoint reports a temporary error
+            OSError: If the token request fails on the network
         """
-        # Check if we have valid credentials
-        if not all([self.client_id, self.client_secret, self.tenant_id]):
+        # Check if we have valid credentials (before taking the lock)
+        if not self._credentials_ok:
             raise SMTPAuthenticationError(
                 0,
                 "OAuth2 credentials not configured. Please set MICROSOFT_CLIENT_ID, "
                 "MICROSOFT_CLIENT_SECRET, and MICROSOFT_TENANT_ID environment variables."
             )
 
-        # Thread-safe token acquisition
-        with self._token_lock:
-            cache_key = f"{self.client_id}:{self.tenant_id}"
-
-            # Check cache first
-            if cache_key in self._token_cache:
-                cached_token = self._token_cache[cache_key]
-                logger.debug("Using cached OAuth2 token")
-                return cached_token
-
-            try:
-                # Scopes for Office 365 SMTP access
-                scopes = ["https://outlook.office365.com/.default"]
+        # Django's cache is shared by every worker process when a shared
+        # cache backend is configured, so one token serves them all
+        cache_key = self._token_cache_key(self.client_id, self.tenant_id)
+        access_token = cache.get(cache_key)
+        if access_token:
+            logger.debug("Using cached OAuth2 token")
+            return access_token
 
+        # No lock held here: MSAL's token cache is thread-safe, so concurrent
+        # senders do not queue behind one another's token request
+        try:
+            # Scopes for Office 365 SMTP access
+            scopes = ["https://outlook.office365.com/.default"]
+
+            # MSAL's token cache tracks expiry, so a cached token is only
+            # returned while it is still valid
+            result = self.msal_app.acquire_token_silent(scopes, account=None)
+            if result:
+                logger.debug("Using OAuth2 token from MSAL cache")
+            else:
                 logger.info("Acquiring OAuth2 access token from Microsoft...")
 
                 # Acquire token using client credentials flow
                 result = self.msal_app.acquire_token_for_client(scopes=scopes)
 
-                if "access_token" in result:
-                    access_token = result["access_token"]
+            if "access_token" in result:
+                access_token = result["access_token"]
 
-                    # Cache the token (MSAL handles expiration internally)
-                    self._token_cache[cache_key] = access_token
+                # Cache until shortly before expiry (expires_in counts down
+                # for tokens served from MSAL's cache)
+                timeout = int(result.get("expires_in", 0)) - TOKEN_EXPIRY_MARGIN
+                if timeout > 0:
+                    cache.set(cache_key, access_token, timeout=timeout)
 
-                    logger.info("OAuth2 access token acquired successfully")
-                    return access_token
-                else:
-                    # Token acquisition failed
-                    error = result.get("error", "unknown_error")
-                    error_description = result.get("error_description", "No description provided")
+                logger.info("OAuth2 access token acquired successfully")
+                return access_token
+            else:
+                # Token acquisition failed
+                error = result.get("error", "unknown_error")
+                error_description = result.get("error_description", "No description provided")
 
-                    logger.error(
-                        f"Failed to acquire OAuth2 token: {error} - {error_description}"
-                    )
+                logger.error(
+                    f"Failed to acquire OAuth2 token: {error} - {error_description}"
+                )
 
-                    raise SMTPAuthenticationError(
-                        0,
+                if error not in PERMANENT_TOKEN_ERRORS:
+                    # e.g. temporarily_unavailable; a plain SMTPException
+                    # lets retry_with_backoff() try again
+                    raise SMTPException(
                         f"OAuth2 token acquisition failed: {error}. "
-                        f"Check your Azure app registration and credentials. "
                         f"Details: {error_description}"
                     )
 
-            except SMTPAuthenticationError:
-                # Re-raise authentication errors
-                raise
-            except Exception as e:
-                logger.error(f"Exception during OAuth2 token acquisition: {str(e)}")
                 raise SMTPAuthenticationError(
                     0,
-                    f"Failed to acquire OAuth2 token: {str(e)}"
+                    f"OAuth2 token acquisition failed: {error}. "
+                    f"Check your Azure app registration and credentials. "
+                    f"Details: {error_description}"
                 )
 
+        except (SMTPException, OSError):
+            # Re-raise SMTP errors, and let network errors from the token
+            # request (requests exceptions are OSErrors) through unchanged
+            # so they are retried
+            raise
+        except Exception as e:
+            # Anything else is a configuration problem, e.g. an unknown tenant
+            logger.error(f"Exception during OAuth2 token acquisition: {str(e)}")
+            raise SMTPAuthenticationError(
+                0,
+                f"Failed to acquire OAuth2 token: {str(e)}"
+            )
+
     def generate_oauth2_string(self, user: str, access_token: str) -> str:
         """
         Generate the OAuth2 authentication string for SMTP XOAUTH2.
@@ -187,23 +278,18 @@ class OAuth2EmailBackend(EmailBackend):
         Returns:
             str: Base64-encoded OAuth2 authentication string
         """
-        auth_string = f"user={user}\x01auth=Bearer {access_token}\x01\x01"
-        return base64.b64encode(auth_string.encode()).decode()
+        return _oauth2_b64(user, access_token)
 
-    def open(self):
+    def open_connection(self):
         """
         Open connection to SMTP server and authenticate using OAuth2.
 
-        This method overrides the parent class's open() method to use
-        OAuth2 authentication instead of username/password.
+        Called by open() when no pooled connection is available. Replaces
+        the parent class's username/password login with OAuth2.
 
         Returns:
-            bool: True if connection opened, False if already open
+            bool: True if connection opened, False if it failed silently
         """
-        if self.connection:
-            # Already have an open connection
-            return False
-
         try:
             # Create SMTP connection
             connection_params = {
@@ -244,20 +330,12 @@ class OAuth2EmailBackend(EmailBackend):
             # Get access token
             access_token = self.get_access_token()
 
-            # Get the email address to authenticate as
-            # Use EMAIL_HOST_USER from settings, or fall back to DEFAULT_FROM_EMAIL
-            user_email = getattr(settings, 'EMAIL_HOST_USER', None)
-            if not user_email:
-                user_email = settings.DEFAULT_FROM_EMAIL
-
             # Generate OAuth2 auth string
-            oauth2_string = self.generate_oauth2_string(user_email, access_token)
-
-            # Authenticate using XOAUTH2
-            self.connection.ehlo()
+            oauth2_string = self.generate_oauth2_string(self.auth_user, access_token)
 
-            # Use the SMTP AUTH command with XOAUTH2
-            # The AUTH XOAUTH2 command expects the base64-encoded auth string
+            # Authenticate using XOAUTH2 (the EHLO above already advertised AUTH)
+            # The base64-encoded auth string is sent as the initial response,
+            # so authentication takes a single round-trip
             code, response = self.connection.docmd(
                 "AUTH XOAUTH2",
                 oauth2_string
@@ -266,10 +344,13 @@ class OAuth2EmailBackend(EmailBackend):
             if code != 235:  # 235 = Authentication successful
                 error_msg = response.decode() if isinstance(response, bytes) else str(response)
                 logger.error(f"OAuth2 authentication failed with code {code}: {error_msg}")
-                raise SMTPAuthenticationError(
-                    code,
-                    f"OAuth2 authentication failed: {error_msg}"
-                )
+                if code == 535:  # 535 = Credentials rejected
+                    raise SMTPAuthenticationError(
+                        code,
+                        f"OAuth2 authentication failed: {error_msg}"
+                    )
+                # Other replies (e.g. 454 temporary failure) may be retried
+                raise SMTPResponseException(code, f"OAuth2 authentication failed: {error_msg}")
 
             logger.info("OAuth2 authentication successful")
             return True
@@ -300,6 +381,11 @@ class OAuth2EmailBackend(EmailBackend):
                 raise
             return False
 
+    @staticmethod
+    def _token_cache_key(client_id: str, tenant_id: str) -> str:
+        """Django cache key for the access token of one app registration"""
+        return f"ms_oauth_token:{tenant_id}:{client_id}"
+
     @classmethod
     def clear_token_cache(cls):
         """
@@ -307,5 +393,8 @@ class OAuth2EmailBackend(EmailBackend):
         Useful for testing or forcing token refresh.
         """
         with cls._token_lock:
-            cls._token_cache.clear()
+            for (client_id, tenant_id), app in cls._msal_apps.items():
+                app.remove_tokens_for_client()
+                cache.delete(cls._token_cache_key(client_id, tenant_id))
+            _oauth2_b64.cache_clear()
             logger.info("OAuth2 token cache cleared")
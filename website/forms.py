@@ -1,6 +1,13 @@
 from django import forms
+from django.core import signing
 from .models import Contact
 
+# Submissions sent sooner than this after the form was rendered are from bots
+MIN_SUBMIT_SECONDS = 2
+
+# Signs the render time carried in the form, so it cannot be forged
+_timestamp_signer = signing.TimestampSigner(salt='website.forms.ContactForm')
+
 
 class ContactForm(forms.ModelForm):
     """
@@ -8,6 +15,33 @@ class ContactForm(forms.ModelForm):
     Includes validation and custom error messages.
     """
 
+    # Spam traps: a field hidden from humans with CSS that bots fill in,
+    # and a signed token holding the time the form was rendered
+    website = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'autocomplete': 'off', 'tabindex': '-1'}),
+    )
+    ts = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, check_spam=True, **kwargs):
+        """
+        Args:
+            check_spam: Apply the spam traps. Pass False for stored or
+                imported submissions, which were never rendered to a visitor.
+        """
+        super().__init__(*args, **kwargs)
+        self.check_spam = check_spam
+        self.fields['ts'].initial = _timestamp_signer.sign('contact')
+
+    def refresh_timestamp(self):
+        """
+        Give a rejected form a new render time, so the re-rendered page
+        does not carry a stale or missing token forward.
+        """
+        if self.is_bound:
+            self.data = self.data.copy()
+            self.data[self.add_prefix('ts')] = self.fields['ts'].initial
+
     class Meta:
         model = Contact
         fields = ['name', 'email', 'phone', 'subject', 'message']
@@ -56,39 +90,36 @@ class ContactForm(forms.ModelForm):
             },
         }
 
-    def clean_name(self):
-        """Validate and clean the name field"""
-        name = self.cleaned_data.get('name', '').strip()
-        if not name:
-            raise forms.ValidationError('Name cannot be empty.')
-        if len(name) < 2:
-            raise forms.ValidationError('Name must be at least 2 characters long.')
-        return name
+    def clean(self):
+        """
+        Reject spam and normalise the email address.
+        The form fields strip whitespace and the model field validators
+        enforce the minimum lengths.
+        """
+        cleaned_data = super().clean()
 
-    def clean_email(self):
-        """Validate and clean the email field"""
-        email = self.cleaned_data.get('email', '').strip().lower()
-        return email
+        # Reject bot submissions before doing any other work
+        if self.check_spam and self._is_spam(cleaned_data):
+            raise forms.ValidationError('Your message could not be sent. Please try again.')
 
-    def clean_subject(self):
-        """Validate and clean the subject field"""
-        subject = self.cleaned_data.get('subject', '').strip()
-        if not subject:
-            raise forms.ValidationError('Subject cannot be empty.')
-        if len(subject) < 5:
-            raise forms.ValidationError('Subject must be at least 5 characters long.')
-        return subject
+        email = cleaned_data.get('email')
+        if email:
+            cleaned_data['email'] = email.lower()
 
-    def clean_message(self):
-        """Validate and clean the message field"""
-        message = self.cleaned_data.get('message', '').strip()
-        if not message:
-            raise forms.ValidationError('Message cannot be empty.')
-        if len(message) < 10:
-            raise forms.ValidationError('Message must be at least 10 characters long.')
-        return message
+        return cleaned_data
 
-    def clean_phone(self):
-        """Validate and clean the phone field (optional)"""
-        phone = self.cleaned_data.get('phone', '').strip()
-        return phone
+    @staticmethod
+    def _is_spam(cleaned_data):
+        """True if the honeypot is filled or the timestamp is missing, forged or too recent"""
+        if cleaned_data.get('website'):
+            return True
+        try:
+            _timestamp_signer.unsign(cleaned_data.get('ts') or '', max_age=MIN_SUBMIT_SECONDS)
+        except signing.SignatureExpired:
+            # Old enough to have been filled in by a person
+            return False
+        except signing.BadSignature:
+            # Missing or forged
+            return True
+        # Still within MIN_SUBMIT_SECONDS of being rendered
+        return True
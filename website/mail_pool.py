@@ -0,0 +1,157 @@
+"""
+Process-wide pool of authenticated SMTP connections.
+
+Opening an SMTP session costs a TCP connect, a TLS handshake, EHLO and
+AUTH. The backends here keep sessions open between sends and hand each
+one to a single backend at a time, so threads never share a socket.
+
+Usage:
+    EMAIL_BACKEND = 'website.mail_pool.PooledSMTPBackend'
+"""
+
+import atexit
+import logging
+import threading
+import time
+from smtplib import SMTPException
+
+from django.core.mail.backends.smtp import EmailBackend
+
+logger = logging.getLogger(__name__)
+
+# Reconnect after this many seconds, before the server drops an idle session
+MAX_CONNECTION_AGE = 100
+
+# Idle connections kept per (host, port, user)
+MAX_IDLE_CONNECTIONS = 2
+
+
+class SMTPConnectionPool:
+    """
+    Idle SMTP connections keyed by (host, port, user).
+    A connection is removed from the pool while it is in use.
+    """
+
+    def __init__(self, max_age=MAX_CONNECTION_AGE, max_idle=MAX_IDLE_CONNECTIONS):
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def checkout(self, key):
+        """
+        Take a live connection out of the pool.
+
+        Returns:
+            tuple: (connection, opened_at), or None if there is no usable one
+        """
+        while True:
+            with self._lock:
+                idle = self._connections.get(key)
+                if not idle:
+                    return None
+                connection, opened_at = idle.pop()
+
+            if time.monotonic() - opened_at < self.max_age:
+                try:
+                    # RSET both checks the session is alive and clears any
+                    # transaction a failed send left behind
+                    code, _ = connection.rset()
+                    if code == 250:
+                        return connection, opened_at
+                except (SMTPException, OSError):
+                    pass
+
+            _quit(connection)
+
+    def checkin(self, key, connection, opened_at):
+        """
+        Return a connection to the pool.
+
+        Returns:
+            bool: False if it is too old or the pool is full; the caller
+            should close it
+        """
+        if time.monotonic() - opened_at >= self.max_age:
+            return False
+
+        with self._lock:
+            idle = self._connections.setdefault(key, [])
+            if len(idle) >= self.max_idle:
+                return False
+            idle.append((connection, opened_at))
+            return True
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle = [connection for entries in self._connections.values()
+                    for connection, _ in entries]
+            self._connections.clear()
+
+        for connection in idle:
+            _quit(connection)
+
+
+def _quit(connection):
+    """Close an SMTP connection, ignoring errors from a dead session"""
+    try:
+        connection.quit()
+    except (SMTPException, OSError):
+        try:
+            connection.close()
+        except OSError:
+            pass
+
+
+connection_pool = SMTPConnectionPool()
+atexit.register(connection_pool.close_all)
+
+
+class PooledConnectionMixin:
+    """
+    Email backend mixin that reuses connections from connection_pool.
+
+    open() checks out a pooled connection when one is available and
+    otherwise calls open_connection() to create a new one. close() puts
+    the connection back in the pool instead of quitting it.
+    """
+
+    def get_pool_key(self):
+        """Connections are only reused for the same server and user"""
+        return (self.host, self.port, self.username)
+
+    def open_connection(self):
+        """Open and authenticate a new connection (Django's SMTP login by default)"""
+        return super().open()
+
+    def open(self):
+        if self.connection:
+            # Already have an open connection
+            return False
+
+        pool_key = self.get_pool_key()
+        pooled = connection_pool.checkout(pool_key)
+        if pooled is not None:
+            logger.debug("Reusing pooled SMTP connection")
+            self.connection, self._opened_at = pooled
+            self._pool_key = pool_key
+            return True
+
+        opened = self.open_connection()
+        if self.connection is not None:
+            self._opened_at = time.monotonic()
+            self._pool_key = pool_key
+        return opened
+
+    def close(self):
+        if self.connection is not None and connection_pool.checkin(
+                self._pool_key, self.connection, self._opened_at):
+            self.connection = None
+            return
+
+        super().close()
+
+
+class PooledSMTPBackend(PooledConnectionMixin, EmailBackend):
+    """Django's SMTP backend (username/password auth) with pooled connections"""
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at'], name='website_con_created_139ba7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['read', '-created_at'], name='website_con_read_91b7bb_idx'),
+        ),
+    ]
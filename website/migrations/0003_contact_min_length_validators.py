@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:39
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0002_contact_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='message',
+            field=models.TextField(help_text='Detailed message', validators=[django.core.validators.MinLengthValidator(10, 'Message must be at least 10 characters long.')]),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='name',
+            field=models.CharField(help_text='Full name of the person contacting us', max_length=200, validators=[django.core.validators.MinLengthValidator(2, 'Name must be at least 2 characters long.')]),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='subject',
+            field=models.CharField(help_text='Subject of the inquiry', max_length=300, validators=[django.core.validators.MinLengthValidator(5, 'Subject must be at least 5 characters long.')]),
+        ),
+    ]
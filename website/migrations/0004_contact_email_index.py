@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0003_contact_min_length_validators'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='email',
+            field=models.EmailField(db_index=True, help_text='Email address for response', max_length=254),
+        ),
+    ]
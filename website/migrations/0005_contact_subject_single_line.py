@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-15 07:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0004_contact_email_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='subject',
+            field=models.CharField(help_text='Subject of the inquiry', max_length=300, validators=[django.core.validators.MinLengthValidator(5, 'Subject must be at least 5 characters long.'), django.core.validators.RegexValidator('[\\r\\n]', 'Subject must be a single line.', inverse_match=True)]),
+        ),
+    ]
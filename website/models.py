@@ -1,25 +1,92 @@
+from django.core.validators import MinLengthValidator, RegexValidator
 from django.db import models
 from django.utils import timezone
 
 
+class ContactQuerySet(models.QuerySet):
+    """QuerySet for Contact with list and bulk status helpers"""
+
+    def for_list(self):
+        """Only the columns shown in message lists, leaving out message and notes"""
+        return self.only('id', 'name', 'email', 'subject', 'created_at', 'read')
+
+    def mark_as_read(self):
+        """Mark all messages as read in one UPDATE; returns the number changed"""
+        return self.filter(read=False).update(read=True)
+
+    def mark_as_unread(self):
+        """Mark all messages as unread in one UPDATE; returns the number changed"""
+        return self.filter(read=True).update(read=False)
+
+
+class ContactManager(models.Manager.from_queryset(ContactQuerySet)):
+    """Manager for Contact with batch helpers"""
+
+    def bulk_create_submissions(self, submissions, batch_size=500):
+        """
+        Save many stored or imported submissions with batched INSERTs.
+
+        Each submission is a dict of contact form data. It is validated by
+        ContactForm without the spam traps, which only apply to a form
+        rendered to a visitor. Note that bulk_create does not send the
+        pre_save/post_save signals.
+
+        Returns:
+            tuple: (created Contact instances, rejected ContactForms with
+            their errors)
+        """
+        # Imported here because the forms module imports this one
+        from .forms import ContactForm
+
+        contacts, rejected = [], []
+        for data in submissions:
+            form = ContactForm(data, check_spam=False)
+            if form.is_valid():
+                contacts.append(form.save(commit=False))
+            else:
+                rejected.append(form)
+        return self.bulk_create(contacts, batch_size=batch_size), rejected
+
+
 class Contact(models.Model):
     """
     Model to store contact form submissions.
     All messages are stored in the database and can be viewed in Django admin.
     """
-    name = models.CharField(max_length=200, help_text="Full name of the person contacting us")
-    email = models.EmailField(help_text="Email address for response")
+    name = models.CharField(
+        max_length=200,
+        validators=[MinLengthValidator(2, 'Name must be at least 2 characters long.')],
+        help_text="Full name of the person contacting us",
+    )
+    email = models.EmailField(db_index=True, help_text="Email address for response")
     phone = models.CharField(max_length=20, blank=True, help_text="Optional phone number")
-    subject = models.CharField(max_length=300, help_text="Subject of the inquiry")
-    message = models.TextField(help_text="Detailed message")
+    subject = models.CharField(
+        max_length=300,
+        validators=[
+            MinLengthValidator(5, 'Subject must be at least 5 characters long.'),
+            # The subject is copied into email Subject headers
+            RegexValidator(r'[\r\n]', 'Subject must be a single line.', inverse_match=True),
+        ],
+        help_text="Subject of the inquiry",
+    )
+    message = models.TextField(
+        validators=[MinLengthValidator(10, 'Message must be at least 10 characters long.')],
+        help_text="Detailed message",
+    )
     created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp when message was received")
     read = models.BooleanField(default=False, help_text="Mark as read/unread")
     notes = models.TextField(blank=True, help_text="Internal notes (visible only to admin)")
 
+    objects = ContactManager()
+
     class Meta:
         verbose_name = "Contact Message"
         verbose_name_plural = "Contact Messages"
         ordering = ['-created_at']  # Newest first
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['read', '-created_at']),  # Unread/read filter, newest first
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.subject} ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
@@ -27,9 +94,9 @@ class Contact(models.Model):
     def mark_as_read(self):
         """Mark this message as read"""
         self.read = True
-        self.save()
+        self.save(update_fields=['read'])
 
     def mark_as_unread(self):
         """Mark this message as unread"""
         self.read = False
-        self.save()
+        self.save(update_fields=['read'])
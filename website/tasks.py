@@ -0,0 +1,267 @@
+"""
+Background tasks for the website app.
+
+Work that the visitor does not need to wait for, such as email
+notifications, runs on a small background worker pool so the response
+is not held up by the SMTP server.
+
+Delivery is best-effort and in-process: the workers are daemon threads,
+so tasks still queued when the process exits are dropped (and logged)
+and a running task is abandoned. An SMTP outage cannot hold up a reload
+or shutdown.
+"""
+
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from smtplib import SMTPAuthenticationError, SMTPException, SMTPRecipientsRefused
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections
+from django.template.loader import render_to_string
+
+from .models import Contact
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Outgoing email is handled by this many worker threads reading one
+# queue. Two workers keep slow SMTP sessions from piling up threads.
+EMAIL_WORKERS = 2
+
+# Queued (future, func, args, kwargs) tasks
+_email_queue = queue.Queue()
+
+# Worker threads, started on first use
+_workers = []
+_workers_lock = threading.Lock()
+
+# Set when the interpreter starts shutting down
+_shutting_down = threading.Event()
+
+# Retry schedule for transient SMTP failures: attempt n waits a random
+# time between 0 and min(RETRY_BACKOFF_MAX, 2 ** n) seconds
+MAX_RETRIES = 5
+RETRY_BACKOFF_MAX = 600
+
+# Bulk sends go out in batches of this size with a pause in between, to
+# stay under Microsoft 365's per-mailbox sending rate
+BULK_BATCH_SIZE = 50
+BULK_BATCH_DELAY = 0.5
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Queue func(*args, **kwargs) for the email workers.
+    Exceptions are logged, since callers usually do not wait on the result.
+
+    Returns:
+        Future: Resolves to the task's return value or exception
+
+    Raises:
+        RuntimeError: If the process is shutting down
+    """
+    if _shutting_down.is_set():
+        raise RuntimeError("Email worker is shutting down")
+    _start_workers()
+
+    future = Future()
+    _email_queue.put((future, func, args, kwargs))
+    return future
+
+
+def _start_workers():
+    """Start the daemon worker threads if they are not running yet"""
+    with _workers_lock:
+        if _workers:
+            return
+        for number in range(EMAIL_WORKERS):
+            worker = threading.Thread(target=_work, name=f'email_{number}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def _work():
+    """Worker loop: run queued tasks and resolve their futures"""
+    while True:
+        future, func, args, kwargs = _email_queue.get()
+        if _shutting_down.is_set():
+            # Picked up while queued tasks were being dropped
+            _drop_task(future, func, args)
+            continue
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            logger.error(f"Background task {func.__name__} failed: {str(e)}")
+            future.set_exception(e)
+        finally:
+            # Close the database connections this thread opened
+            connections.close_all()
+
+
+def _describe_task(func, args):
+    """Short description of a task for log messages, e.g. send_contact_notification(42, <str>)"""
+    summaries = []
+    for arg in args:
+        if isinstance(arg, int):
+            summaries.append(repr(arg))
+        elif isinstance(arg, (list, tuple, set)):
+            summaries.append(f"<{len(arg)} items>")
+        else:
+            summaries.append(f"<{type(arg).__name__}>")
+    return f"{func.__name__}({', '.join(summaries)})"
+
+
+@atexit.register
+def _drop_pending_tasks():
+    """
+    Log and cancel tasks still queued at interpreter exit. The workers
+    are daemon threads, so exit never waits for queued or running mail.
+    """
+    _shutting_down.set()
+    while True:
+        try:
+            future, func, args, kwargs = _email_queue.get_nowait()
+        except queue.Empty:
+            return
+        _drop_task(future, func, args)
+
+
+def _drop_task(future, func, args):
+    """Cancel a queued task at shutdown and log what was lost"""
+    if future.cancel():
+        logger.warning(f"Dropped queued task at shutdown: {_describe_task(func, args)}")
+
+
+def retry_with_backoff(func, *args, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Call func(*args, **kwargs), retrying SMTP and network errors with
+    exponential backoff and random jitter, so retries from several senders
+    do not hit a throttled server at the same moment.
+    Authentication errors are raised at once since retrying will not fix them.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except SMTPAuthenticationError:
+            raise
+        except (SMTPException, OSError) as e:
+            if attempt == max_retries or _shutting_down.is_set():
+                raise
+            delay = random.uniform(0, min(RETRY_BACKOFF_MAX, 2 ** attempt))
+            logger.warning(f"{func.__name__} failed: {str(e)}. Retrying in {delay:.1f}s")
+            # Wakes early, and gives up, if the process starts shutting down
+            if _shutting_down.wait(delay):
+                raise
+
+
+def send_contact_notification(contact_id, admin_url, connection=None):
+    """
+    Email the site admin about a new contact form submission.
+
+    Args:
+        contact_id: Primary key of the saved Contact message
+        admin_url: Absolute URL of the Contact list in Django admin
+        connection: Optional open email backend, so batched sends can
+            share one SMTP session. A new connection is used if omitted.
+    """
+    # Only the fields the templates show; notes and status are not needed
+    contact_message = Contact.objects.only(
+        'id', 'name', 'email', 'phone', 'subject', 'message', 'created_at'
+    ).get(pk=contact_id)
+
+    # Email subject
+    email_subject = f"New Contact Form Submission: {contact_message.subject}"
+
+    # Email bodies (HTML and plain text), rendered from cached templates.
+    # Autoescaping keeps submitted text from injecting markup into the email.
+    context = {'contact': contact_message, 'admin_url': admin_url}
+    email_body_html = render_to_string('website/emails/contact_notification.html', context)
+    email_body_text = render_to_string('website/emails/contact_notification.txt', context)
+
+    # Send email notification (bodies are rendered before any SMTP
+    # connection is opened)
+    email = EmailMultiAlternatives(
+        subject=email_subject,
+        body=email_body_text,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[settings.ADMIN_EMAIL],
+        connection=connection,
+    )
+    email.attach_alternative(email_body_html, "text/html")
+    retry_with_backoff(email.send, fail_silently=False)
+
+    logger.info(f"Contact form submitted by {contact_message.email} - Email sent successfully")
+
+
+def send_acknowledgements(contact_ids):
+    """
+    Email each sender a confirmation that their message was received.
+
+    All emails are rendered first and then sent over a single SMTP
+    session, in batches of BULK_BATCH_SIZE. An email that cannot be built
+    or is rejected is logged, and the rest are still sent.
+
+    Args:
+        contact_ids: Primary keys of the Contact messages to acknowledge
+
+    Returns:
+        int: Number of emails sent
+    """
+    contacts = Contact.objects.filter(pk__in=contact_ids).only(
+        'id', 'name', 'email', 'subject', 'created_at'
+    )
+
+    # Render every message before the connection is opened, so the SMTP
+    # session never sits idle while templates render
+    emails = []
+    queued = 0
+    for contact_message in contacts:
+        queued += 1
+        context = {'contact': contact_message}
+        email = EmailMultiAlternatives(
+            subject=f"We received your message: {contact_message.subject}",
+            body=render_to_string('website/emails/contact_acknowledgement.txt', context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[contact_message.email],
+        )
+        email.attach_alternative(
+            render_to_string('website/emails/contact_acknowledgement.html', context),
+            "text/html",
+        )
+        try:
+            # Build the MIME message now, so a bad header (e.g. a line
+            # break in a subject saved before it was validated) skips this
+            # row instead of aborting the send loop
+            email.message()
+        except ValueError as e:
+            logger.error(f"Acknowledgement to {contact_message.email} skipped: {str(e)}")
+            continue
+        emails.append(email)
+
+    sent = 0
+    with get_connection(fail_silently=False) as connection:
+        for start in range(0, len(emails), BULK_BATCH_SIZE):
+            if start:
+                time.sleep(BULK_BATCH_DELAY)
+            # Sent one at a time so a bad address does not stop the rest.
+            # Not retried: the message may already have been delivered.
+            for email in emails[start:start + BULK_BATCH_SIZE]:
+                try:
+                    sent += connection.send_messages([email])
+                except (SMTPException, OSError) as e:
+                    logger.error(f"Acknowledgement to {email.to[0]} failed: {str(e)}")
+                    if not isinstance(e, SMTPRecipientsRefused):
+                        # The session may be unusable; the next message
+                        # opens a new one
+                        connection.close()
+
+    logger.info(f"Sent {sent} of {queued} acknowledgement email(s)")
+    return sent
@@ -1,3 +1,388 @@
-from django.test import TestCase
+import time
+from smtplib import SMTPAuthenticationError, SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .email_backend import TOKEN_EXPIRY_MARGIN, OAuth2EmailBackend
+from .forms import ContactForm, _timestamp_signer
+from .mail_pool import PooledSMTPBackend, SMTPConnectionPool, connection_pool
+from .models import Contact
+from .tasks import (
+    _describe_task, retry_with_backoff, run_in_background, send_acknowledgements,
+    send_contact_notification,
+)
+
+VALID_DATA = {
+    'name': 'Jane Doe',
+    'email': 'Jane@Example.com',
+    'phone': '',
+    'subject': 'Property question',
+    'message': 'I would like to know more about your properties.',
+}
+
+
+def old_timestamp(seconds=10):
+    """A signed form timestamp from some seconds ago"""
+    with mock.patch('django.core.signing.time.time', return_value=time.time() - seconds):
+        return _timestamp_signer.sign('contact')
+
+
+@mock.patch('smtplib.SMTP')
+class PooledSMTPBackendTests(TestCase):
+    """Connection reuse through website.mail_pool"""
+
+    def setUp(self):
+        connection_pool.close_all()
+
+    def tearDown(self):
+        connection_pool.close_all()
+
+    def get_backend(self):
+        return PooledSMTPBackend(host='smtp.example.com', port=587,
+                                 username='user', password='secret', use_tls=False)
+
+    def test_connection_is_reused(self, smtp):
+        smtp.return_value.rset.return_value = (250, b'OK')
+
+        first = self.get_backend()
+        first.open()
+        first.close()
+        second = self.get_backend()
+        second.open()
+
+        self.assertEqual(smtp.call_count, 1)
+        self.assertIs(second.connection, smtp.return_value)
+        smtp.return_value.rset.assert_called_once()
+        smtp.return_value.quit.assert_not_called()
+
+    def test_connection_in_use_is_not_shared(self, smtp):
+        first = self.get_backend()
+        first.open()
+        second = self.get_backend()
+        second.open()
+
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_failed_rset_reconnects(self, smtp):
+        stale, fresh = mock.Mock(), mock.Mock()
+        stale.rset.side_effect = SMTPServerDisconnected('gone')
+        smtp.side_effect = [stale, fresh]
+
+        first = self.get_backend()
+        first.open()
+        first.close()
+        second = self.get_backend()
+        second.open()
+
+        self.assertIs(second.connection, fresh)
+        stale.quit.assert_called_once()
+
+
+class SMTPConnectionPoolTests(TestCase):
+    """Eviction rules of SMTPConnectionPool"""
+
+    key = ('smtp.example.com', 587, 'user')
+
+    def test_old_connection_is_not_checked_in(self):
+        pool = SMTPConnectionPool(max_age=100)
+        self.assertFalse(pool.checkin(self.key, mock.Mock(), time.monotonic() - 100))
+
+    def test_connection_aged_out_while_idle_is_closed(self):
+        pool = SMTPConnectionPool(max_age=100)
+        connection = mock.Mock()
+        opened_at = time.monotonic() - 99
+        self.assertTrue(pool.checkin(self.key, connection, opened_at))
+
+        with mock.patch('website.mail_pool.time.monotonic', return_value=opened_at + 100):
+            self.assertIsNone(pool.checkout(self.key))
+        connection.quit.assert_called_once()
+        connection.rset.assert_not_called()
+
+    def test_idle_connections_are_capped(self):
+        pool = SMTPConnectionPool(max_idle=2)
+        now = time.monotonic()
+        self.assertTrue(pool.checkin(self.key, mock.Mock(), now))
+        self.assertTrue(pool.checkin(self.key, mock.Mock(), now))
+        self.assertFalse(pool.checkin(self.key, mock.Mock(), now))
+
+
+class RunInBackgroundTests(TestCase):
+    """The email worker queue"""
+
+    def test_future_resolves_to_result(self):
+        self.assertEqual(run_in_background(sum, [1, 2, 3]).result(timeout=5), 6)
+
+    def test_future_carries_exception(self):
+        future = run_in_background(int, 'not a number')
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+
+    def test_dropped_task_is_summarised(self):
+        self.assertEqual(_describe_task(send_acknowledgements, (list(range(5000)),)),
+                         'send_acknowledgements(<5000 items>)')
+        self.assertEqual(_describe_task(send_contact_notification, (42, 'http://testserver/admin/')),
+                         'send_contact_notification(42, <str>)')
+
+
+@mock.patch('website.tasks.random.uniform', return_value=0)
+class RetryWithBackoffTests(TestCase):
+    """Which failures retry_with_backoff retries"""
+
+    def test_transient_errors_are_retried(self, uniform):
+        func = mock.Mock(side_effect=[SMTPServerDisconnected('gone'), OSError('timed out'), 'sent'])
+        func.__name__ = 'send'
+        self.assertEqual(retry_with_backoff(func, max_retries=3), 'sent')
+        self.assertEqual(func.call_count, 3)
+
+    def test_gives_up_after_max_retries(self, uniform):
+        func = mock.Mock(side_effect=OSError('timed out'))
+        func.__name__ = 'send'
+        with self.assertRaises(OSError):
+            retry_with_backoff(func, max_retries=2)
+        self.assertEqual(func.call_count, 3)
+
+    def test_authentication_errors_are_not_retried(self, uniform):
+        func = mock.Mock(side_effect=SMTPAuthenticationError(535, b'rejected'))
+        func.__name__ = 'send'
+        with self.assertRaises(SMTPAuthenticationError):
+            retry_with_backoff(func, max_retries=3)
+        self.assertEqual(func.call_count, 1)
+
+    @override_settings(MICROSOFT_CLIENT_ID='client', MICROSOFT_CLIENT_SECRET='secret',
+                       MICROSOFT_TENANT_ID='tenant')
+    @mock.patch('smtplib.SMTP')
+    def test_token_endpoint_timeout_is_retried(self, smtp, uniform):
+        cache.clear()
+        backend = OAuth2EmailBackend(host='smtp.example.com', port=587, use_tls=False)
+        backend._msal_app = mock.Mock()
+        backend._msal_app.acquire_token_silent.side_effect = requests.ConnectTimeout('timed out')
+
+        with self.assertRaises(requests.ConnectTimeout):
+            retry_with_backoff(backend.open, max_retries=2)
+        self.assertEqual(backend._msal_app.acquire_token_silent.call_count, 3)
+
+
+@override_settings(MICROSOFT_CLIENT_ID='client', MICROSOFT_CLIENT_SECRET='secret',
+                   MICROSOFT_TENANT_ID='tenant')
+class OAuth2TokenTests(TestCase):
+    """Where OAuth2EmailBackend.get_access_token gets its token from"""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = OAuth2EmailBackend()
+        self.backend._msal_app = mock.Mock()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_msal_cache_hit_skips_token_request(self):
+        self.backend._msal_app.acquire_token_silent.return_value = {
+            'access_token': 'silent-token', 'expires_in': 3600,
+        }
+
+        self.assertEqual(self.backend.get_access_token(), 'silent-token')
+        self.backend._msal_app.acquire_token_for_client.assert_not_called()
+
+    def test_msal_cache_miss_requests_token(self):
+        self.backend._msal_app.acquire_token_silent.return_value = None
+        self.backend._msal_app.acquire_token_for_client.return_value = {
+            'access_token': 'new-token', 'expires_in': 3600,
+        }
+
+        self.assertEqual(self.backend.get_access_token(), 'new-token')
+        self.backend._msal_app.acquire_token_for_client.assert_called_once()
+
+    def test_django_cache_hit_skips_msal(self):
+        cache.set(OAuth2EmailBackend._token_cache_key('client', 'tenant'), 'shared-token')
+
+        self.assertEqual(self.backend.get_access_token(), 'shared-token')
+        self.backend._msal_app.acquire_token_silent.assert_not_called()
+
+    def test_token_is_cached_until_expiry_margin(self):
+        self.backend._msal_app.acquire_token_silent.return_value = {
+            'access_token': 'new-token', 'expires_in': 3600,
+        }
+
+        with mock.patch('website.email_backend.cache') as token_cache:
+            token_cache.get.return_value = None
+            self.backend.get_access_token()
+        token_cache.set.assert_called_once_with(
+            OAuth2EmailBackend._token_cache_key('client', 'tenant'), 'new-token',
+            timeout=3600 - TOKEN_EXPIRY_MARGIN,
+        )
+
+    def test_nearly_expired_token_is_not_cached(self):
+        self.backend._msal_app.acquire_token_silent.return_value = {
+            'access_token': 'old-token', 'expires_in': TOKEN_EXPIRY_MARGIN,
+        }
+
+        self.assertEqual(self.backend.get_access_token(), 'old-token')
+        self.assertIsNone(cache.get(OAuth2EmailBackend._token_cache_key('client', 'tenant')))
+
+
+class ContactFormTests(TestCase):
+    """Spam traps and validation of ContactForm"""
+
+    def test_valid_submission(self):
+        form = ContactForm({**VALID_DATA, 'ts': old_timestamp()})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['email'], 'jane@example.com')
+
+    def test_filled_honeypot_is_rejected(self):
+        form = ContactForm({**VALID_DATA, 'ts': old_timestamp(), 'website': 'http://spam.example'})
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.non_field_errors())
+
+    def test_missing_timestamp_is_rejected(self):
+        self.assertFalse(ContactForm(VALID_DATA).is_valid())
+
+    def test_unsigned_timestamp_is_rejected(self):
+        self.assertFalse(ContactForm({**VALID_DATA, 'ts': '0'}).is_valid())
+
+    def test_fast_submission_is_rejected(self):
+        form = ContactForm({**VALID_DATA, 'ts': ContactForm().fields['ts'].initial})
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.non_field_errors())
+
+    def test_spam_check_can_be_disabled(self):
+        self.assertTrue(ContactForm(VALID_DATA, check_spam=False).is_valid())
+
+    def test_short_fields_are_rejected(self):
+        form = ContactForm({**VALID_DATA, 'ts': old_timestamp(),
+                            'name': 'J', 'subject': 'Hi', 'message': 'Short'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'name', 'subject', 'message'})
+
+    def test_multiline_subject_is_rejected(self):
+        form = ContactForm({**VALID_DATA, 'ts': old_timestamp(),
+                            'subject': 'Question\r\nBcc: x@evil.example'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('subject', form.errors)
+
+
+class BulkCreateSubmissionsTests(TestCase):
+    """Contact.objects.bulk_create_submissions"""
+
+    def test_valid_rows_are_created_and_invalid_rows_returned(self):
+        created, rejected = Contact.objects.bulk_create_submissions(
+            [VALID_DATA, {**VALID_DATA, 'name': 'J'}]
+        )
+        self.assertEqual(len(created), 1)
+        self.assertEqual(Contact.objects.count(), 1)
+        self.assertEqual(len(rejected), 1)
+        self.assertIn('name', rejected[0].errors)
+
+
+class ContactAdminActionTests(TestCase):
+    """Bulk read/unread actions in the Contact admin"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        Contact.objects.bulk_create([
+            Contact(name='Jane Doe', email='jane@example.com', subject='Property question',
+                    message='I would like to know more.', read=read)
+            for read in (False, False, True)
+        ])
+
+    def run_action(self, action):
+        return self.client.post(reverse('admin:website_contact_changelist'), {
+            'action': action,
+            '_selected_action': list(Contact.objects.values_list('pk', flat=True)),
+        }, follow=True)
+
+    def test_mark_as_read_counts_changed_rows(self):
+        response = self.run_action('mark_as_read')
+
+        self.assertContains(response, '2 message(s) marked as read.')
+        self.assertFalse(Contact.objects.filter(read=False).exists())
+
+    def test_mark_as_unread_counts_changed_rows(self):
+        response = self.run_action('mark_as_unread')
+
+        self.assertContains(response, '1 message(s) marked as unread.')
+        self.assertFalse(Contact.objects.filter(read=True).exists())
+
+
+class ContactStatusTests(TestCase):
+    """Contact.mark_as_read / mark_as_unread on a single message"""
+
+    def test_only_read_column_is_written(self):
+        contact_message = Contact.objects.create(
+            name='Jane Doe', email='jane@example.com', subject='Property question',
+            message='I would like to know more.',
+        )
+        contact_message.notes = 'Unsaved edit'
+
+        contact_message.mark_as_read()
+        contact_message.refresh_from_db()
+        self.assertTrue(contact_message.read)
+        self.assertEqual(contact_message.notes, '')
+
+        contact_message.mark_as_unread()
+        contact_message.refresh_from_db()
+        self.assertFalse(contact_message.read)
+
+
+@mock.patch('website.tasks.time.sleep')
+class SendAcknowledgementsTests(TestCase):
+    """Per-message failure handling in send_acknowledgements"""
+
+    def create_contact(self, email, subject='Property question'):
+        # objects.create skips validation, like rows saved before it existed
+        return Contact.objects.create(name='Jane Doe', email=email, subject=subject,
+                                      message='I would like to know more.').pk
+
+    def test_failed_messages_do_not_stop_the_rest(self, sleep):
+        contact_ids = [
+            self.create_contact('refused@example.com'),
+            self.create_contact('header@example.com', subject='Question\r\nBcc: x@evil.example'),
+            self.create_contact('ok@example.com'),
+        ]
+        connection = mock.MagicMock()
+        connection.__enter__.return_value = connection
+
+        def send_messages(emails):
+            recipient = emails[0].to[0]
+            if recipient == 'refused@example.com':
+                raise SMTPRecipientsRefused({recipient: (550, b'No such user')})
+            return 1
+        connection.send_messages.side_effect = send_messages
+
+        with mock.patch('website.tasks.get_connection', return_value=connection):
+            self.assertEqual(send_acknowledgements(contact_ids), 1)
+
+        recipients = [call.args[0][0].to[0] for call in connection.send_messages.call_args_list]
+        self.assertCountEqual(recipients, ['refused@example.com', 'ok@example.com'])
+        connection.close.assert_not_called()
+
+
+class ContactViewTests(TestCase):
+    """The contact form view"""
+
+    @mock.patch('website.views.run_in_background')
+    def test_submission_queues_one_notification_on_commit(self, run_in_background):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse('website:contact'),
+                                        {**VALID_DATA, 'ts': old_timestamp()})
+
+        self.assertRedirects(response, reverse('website:contact'))
+        contact_message = Contact.objects.get()
+        self.assertEqual(len(callbacks), 1)
+        run_in_background.assert_called_once_with(
+            send_contact_notification, contact_message.pk,
+            'http://testserver/admin/website/contact/',
+        )
+
+    @mock.patch('website.views.run_in_background')
+    def test_rejected_submission_shows_error_and_new_timestamp(self, run_in_background):
+        response = self.client.post(reverse('website:contact'), {**VALID_DATA, 'ts': ''})
+
+        self.assertContains(response, 'Your message could not be sent')
+        self.assertNotContains(response, 'name="ts" value=""')
+        self.assertFalse(Contact.objects.exists())
+        run_in_background.assert_not_called()